@@ -1,21 +1,111 @@
 import os
-import json
 import time
 import datetime
 import argparse
+import hashlib
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import orjson
 
 STATE_FILE = "state.json"
 LOG_FILE = "weekly_log.jsonl"
+# New log lines are flushed in blocks of about this many bytes
+LOG_WRITE_CHUNK = 1024 * 1024
+# Entries older than this are moved out of LOG_FILE into ARCHIVE_DIR after each scan
+LOG_RETENTION_DAYS = 14
+ARCHIVE_DIR = os.path.join("logs", "archive")
+SUMMARY_CACHE_FILE = "summary_cache.json"
+# Most recently used summaries kept in SUMMARY_CACHE_FILE; older ones (stale note versions) are dropped
+SUMMARY_CACHE_MAX_ENTRIES = 2000
+# Below this many changed files the notes are processed serially; a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+# content hash -> summary, populated in each worker by _init_worker
+_summary_cache = {}
 
 def load_state():
     if os.path.exists(STATE_FILE):
-        with open(STATE_FILE, 'r') as f:
-            return json.load(f)
-    return {"last_scan": 0}
+        with open(STATE_FILE, 'rb') as f:
+            return orjson.loads(f.read())
+    return {"last_scan": 0, "files": {}}
+
+def _fsync_dir(path):
+    """
+    fsync the directory containing path so a rename or new file in it survives power loss.
+    """
+    if os.name == 'nt':
+        # Windows cannot open directories for fsync; NTFS journals the rename itself
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _atomic_write(path, data, durable=False):
+    """
+    Writes data to a temp file and renames it over path, so a crash never leaves a truncated file.
+    With durable=True the temp file and the directory entry are fsync'ed too (slower, survives power loss).
+    """
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if durable:
+        _fsync_dir(path)
+
+def save_state(state, durable=False):
+    """
+    Persist the state dict: scan cursor, per-file (mtime, size) cache and the cached Linear team id.
+    """
+    _atomic_write(STATE_FILE, orjson.dumps(state), durable)
+
+def load_summary_cache():
+    if os.path.exists(SUMMARY_CACHE_FILE):
+        with open(SUMMARY_CACHE_FILE, 'rb') as f:
+            return orjson.loads(f.read())
+    return {}
+
+def save_summary_cache(cache, durable=False):
+    """
+    Persist the summary cache, keeping only the SUMMARY_CACHE_MAX_ENTRIES most recently used entries.
+    """
+    if len(cache) > SUMMARY_CACHE_MAX_ENTRIES:
+        cache = dict(list(cache.items())[-SUMMARY_CACHE_MAX_ENTRIES:])
+    _atomic_write(SUMMARY_CACHE_FILE, orjson.dumps(cache), durable)
+
+def content_hash(data, filename):
+    """
+    Short BLAKE2b digest of a note's raw bytes, used as the summary cache key.
+    The filename is hashed too because the summary mentions it.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    h.update(filename.encode('utf-8'))
+    h.update(b'\0')
+    h.update(data)
+    return h.hexdigest()
 
-def save_state(last_scan):
-    with open(STATE_FILE, 'w') as f:
-        json.dump({"last_scan": last_scan}, f)
+def _decode(data, final=True):
+    """
+    Decodes note bytes that were read in a single pass.
+    UTF-16 is only used when a BOM is present; otherwise UTF-8, then GBK, with latin-1 as the catch-all.
+    Pass final=False for a truncated prefix so a multi-byte char cut at the end is dropped instead of failing.
+    """
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encodings = ['utf-16', 'latin-1']
+    else:
+        encodings = ['utf-8', 'gbk', 'latin-1']
+    
+    for encoding in encodings:
+        try:
+            return codecs.getincrementaldecoder(encoding)().decode(data, final)
+        except UnicodeError:
+            continue
 
 def mock_ai_summarize(content, filename):
     """
@@ -33,9 +123,145 @@ def mock_ai_summarize(content, filename):
     summary += f"Contains {len(lines)} lines of text."
     return summary
 
-def scan_and_summarize(vault_path, days_back=None):
+def _iter_md(root):
+    """
+    Yields (DirEntry, mtime) for every Markdown file under root, skipping hidden folders.
+    Shared by daily_summary and scanner so both apply the same folder filter.
+    Each file is stat'ed once and the DirEntry caches the result, so callers can reuse entry.stat() for size/ctime.
+    Symlinked notes are followed like os.walk did; symlinked folders are not (os.walk's followlinks=False).
+    """
+    stack = [os.scandir(root)]
+    try:
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop().close()
+                continue
+            
+            if entry.is_dir(follow_symlinks=False):
+                # Ignore hidden folders (.git, .obsidian, ...) without ever descending into them
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stack.append(os.scandir(entry.path))
+                except OSError as e:
+                    print(f"Error reading {entry.path}: {e}")
+            # NOTE: Currently supports Markdown files (Obsidian default). 
+            # You can add other extensions (e.g., .txt, .org) if you use a different knowledge base system.
+            elif entry.name.endswith('.md') and entry.is_file():
+                try:
+                    yield entry, entry.stat().st_mtime
+                except OSError as e:
+                    print(f"Error reading {entry.path}: {e}")
+    finally:
+        for it in stack:
+            it.close()
+
+def _init_worker(summary_cache):
+    global _summary_cache
+    _summary_cache = summary_cache
+
+def _process_file(file_path, vault_path, current_time):
+    """
+    Read and summarize a single modified file.
+    Returns (content hash, log entry dict), or None if the file is unreadable.
+    """
+    file = os.path.basename(file_path)
+    try:
+        print(f"Processing: {file}")
+        
+        # Read content
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        content = _decode(data)
+        
+        if not content:
+            print(f"  Warning: Could not read {file}")
+            return None
+            
+        # Generate Summary, reusing the cached one if the content is unchanged
+        digest = content_hash(data, file)
+        summary = _summary_cache.get(digest)
+        if summary is None:
+            summary = mock_ai_summarize(content, file)
+        
+        # Create log entry; the hash is only handed back for the summary cache, not logged
+        return digest, {
+            "timestamp": current_time,
+            "file_path": file_path,
+            "rel_path": os.path.relpath(file_path, vault_path),
+            "action": "update", # Simplification
+            "summary": summary
+        }
+        
+    except Exception as e:
+        print(f"Error processing {file}: {e}")
+        return None
+
+def _map_files(worker, paths, summary_cache):
+    """
+    Runs worker over paths, using a process pool only when there is enough work to pay for it.
+    Returns the results in the same order as paths.
+    """
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(paths) < PARALLEL_MIN_FILES:
+        _init_worker(summary_cache)
+        return list(map(worker, paths))
+    
+    # About four chunks per worker keeps them all busy without paying IPC per file
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(summary_cache,)) as ex:
+        return list(ex.map(worker, paths, chunksize=chunksize))
+
+def rotate_log(current_time, durable=False):
+    """
+    Moves log entries older than LOG_RETENTION_DAYS to ARCHIVE_DIR,
+    so the weekly report only has to parse recent activity.
+    """
+    if not os.path.exists(LOG_FILE):
+        return
+    
+    cutoff = current_time - (LOG_RETENTION_DAYS * 86400)
+    keep = []
+    old = []
+    with open(LOG_FILE, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if orjson.loads(line)['timestamp'] > cutoff:
+                # Entries are appended in time order, so nothing before this line is expired
+                if not old:
+                    return
+                keep.append(line)
+                keep.extend(f)
+                break
+            old.append(line if line.endswith(b"\n") else line + b"\n")
+    
+    if not old:
+        return
+    
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    archive_file = os.path.join(ARCHIVE_DIR, f"weekly_log_{int(current_time)}.jsonl")
+    with open(archive_file, 'ab') as f:
+        f.write(b"".join(old))
+        if durable:
+            # The archived entries must be on disk before they are removed from LOG_FILE
+            f.flush()
+            os.fsync(f.fileno())
+    if durable:
+        # Persist the new archive file and the logs/archive directories that may have just been created
+        _fsync_dir(archive_file)
+        _fsync_dir(ARCHIVE_DIR)
+        _fsync_dir(os.path.dirname(ARCHIVE_DIR))
+    
+    _atomic_write(LOG_FILE, b"".join(keep), durable)
+    print(f"Archived {len(old)} log entries older than {LOG_RETENTION_DAYS} days to {archive_file}")
+
+def scan_and_summarize(vault_path, days_back=None, durable=False):
     state = load_state()
     last_scan = state['last_scan']
+    # rel_path -> [mtime, size] of the version we last summarized
+    file_cache = state.get('files', {})
     current_time = time.time()
     
     # If days_back is specified, override last_scan
@@ -45,73 +271,79 @@ def scan_and_summarize(vault_path, days_back=None):
     
     print(f"Scanning changes since: {datetime.datetime.fromtimestamp(last_scan)}")
     
+    # Collect files modified since last scan, then process them (in parallel for large batches).
+    # Files whose (mtime, size) match the cache were already summarized and are skipped without reading,
+    # unless --days asked to re-collect the whole window (e.g. to rebuild a deleted log).
+    use_file_cache = days_back is None
+    candidates = []
+    # Rebuilt from the notes that still exist, so renamed or deleted ones drop out of state.json
+    seen_cache = {}
+    for entry, mtime in _iter_md(vault_path):
+        rel_path = os.path.relpath(entry.path, vault_path)
+        if rel_path in file_cache:
+            seen_cache[rel_path] = file_cache[rel_path]
+        if mtime <= last_scan:
+            continue
+        signature = [mtime, entry.stat().st_size]
+        if not use_file_cache or file_cache.get(rel_path) != signature:
+            candidates.append((entry.path, rel_path, signature))
+    
+    file_cache = seen_cache
+    
     new_logs = []
+    if candidates:
+        summary_cache = load_summary_cache()
+        worker = partial(_process_file, vault_path=vault_path, current_time=current_time)
+        results = _map_files(worker, [path for path, _, _ in candidates], summary_cache)
+        for (_, rel_path, signature), result in zip(candidates, results):
+            if result:
+                digest, log_entry = result
+                new_logs.append(log_entry)
+                file_cache[rel_path] = signature
+                # Re-insert so the dict stays ordered from least to most recently used
+                summary_cache.pop(digest, None)
+                summary_cache[digest] = log_entry['summary']
     
-    for root, dirs, files in os.walk(vault_path):
-        # Ignore hidden folders
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        
-        for file in files:
-            # NOTE: Currently supports Markdown files (Obsidian default). 
-            # You can add other extensions (e.g., .txt, .org) if you use a different knowledge base system.
-            if not file.endswith('.md'):
-                continue
-                
-            file_path = os.path.join(root, file)
-            try:
-                mtime = os.path.getmtime(file_path)
-                
-                if mtime > last_scan:
-                    # File modified since last scan
-                    print(f"Processing: {file}")
-                    
-                    # Read content
-                    content = ""
-                    for encoding in ['utf-8', 'utf-16', 'gbk', 'latin-1']:
-                        try:
-                            with open(file_path, 'r', encoding=encoding) as f:
-                                content = f.read()
-                            break
-                        except UnicodeError:
-                            continue
-                    
-                    if not content:
-                        print(f"  Warning: Could not read {file}")
-                        continue
-                        
-                    # Generate Summary
-                    summary = mock_ai_summarize(content, file)
-                    
-                    # Create log entry
-                    log_entry = {
-                        "timestamp": current_time,
-                        "date_str": datetime.datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S'),
-                        "file_path": file_path,
-                        "rel_path": os.path.relpath(file_path, vault_path),
-                        "action": "update", # Simplification
-                        "summary": summary
-                    }
-                    new_logs.append(log_entry)
-                    
-            except Exception as e:
-                print(f"Error processing {file}: {e}")
-                
     # Append to log file
     if new_logs:
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+        # One write() per ~1 MiB block instead of one per entry
+        with open(LOG_FILE, 'ab') as f:
+            block = []
+            block_size = 0
             for entry in new_logs:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                line = orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+                block.append(line)
+                block_size += len(line)
+                if block_size >= LOG_WRITE_CHUNK:
+                    f.write(b"".join(block))
+                    block = []
+                    block_size = 0
+            if block:
+                f.write(b"".join(block))
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        if durable:
+            # LOG_FILE may have just been created
+            _fsync_dir(LOG_FILE)
         print(f"Logged {len(new_logs)} updates.")
     else:
         print("No changes found.")
         
     # Update state
-    save_state(current_time)
+    state['last_scan'] = current_time
+    state['files'] = file_cache
+    save_state(state, durable)
+    if new_logs:
+        save_summary_cache(summary_cache, durable)
+    
+    rotate_log(current_time, durable)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Scan Obsidian vault for changes and generate daily summaries.")
     parser.add_argument("--vault", required=True, help="Path to Obsidian Vault")
     parser.add_argument("--days", type=int, help="Scan changes from last N days (overrides state)")
+    parser.add_argument("--durable", action="store_true", help="fsync the log, archive, state and summary cache files (and their directories) before finishing")
     args = parser.parse_args()
     
-    scan_and_summarize(args.vault, args.days)
+    scan_and_summarize(args.vault, args.days, durable=args.durable)
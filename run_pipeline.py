@@ -2,18 +2,63 @@ import os
 import argparse
 import subprocess
 import sys
+import traceback
+
+from daily_summary import scan_and_summarize
+from weekly_report import generate_report
 
 def main():
     parser = argparse.ArgumentParser(description="Obsidian AI Weekly Pipeline")
     parser.add_argument("--vault", required=True, help="Path to Obsidian Vault")
     parser.add_argument("--days", type=int, help="Scan changes from last N days")
     parser.add_argument("--publish-linear", action="store_true", help="Publish report to Linear")
+    parser.add_argument("--durable", action="store_true", help="fsync the log, archive, state and summary cache files (and their directories) after scanning")
+    parser.add_argument("--subprocess", action="store_true", help="Run each step as a separate Python process (legacy behaviour)")
     args = parser.parse_args()
 
+    if args.subprocess:
+        run_subprocess(args)
+    else:
+        run_in_process(args)
+
+    print("\n=== Pipeline Completed Successfully ===")
+
+def check_linear_key():
+    # Check if API KEY is set
+    if "LINEAR_API_KEY" not in os.environ:
+        print("Warning: LINEAR_API_KEY not found in environment variables.")
+        print("Please set it before running with --publish-linear.")
+        # We don't exit here, we let weekly_report.py handle it or fail gracefully
+
+def run_in_process(args):
+    """
+    Runs both steps in this interpreter, avoiding a Python startup and re-import per step.
+    """
+    print("=== Step 1: Scanning for changes ===")
+    try:
+        scan_and_summarize(args.vault, args.days, durable=args.durable)
+    except Exception as e:
+        print(f"Error in daily_summary.py: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n=== Step 2: Generating Weekly Report ===")
+    if args.publish_linear:
+        check_linear_key()
+    try:
+        generate_report(".", publish_linear=args.publish_linear)
+    except Exception as e:
+        print(f"Error in weekly_report.py: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+
+def run_subprocess(args):
     print("=== Step 1: Scanning for changes ===")
     cmd_scan = [sys.executable, "daily_summary.py", "--vault", args.vault]
     if args.days:
         cmd_scan.extend(["--days", str(args.days)])
+    if args.durable:
+        cmd_scan.append("--durable")
     
     ret = subprocess.call(cmd_scan)
     if ret != 0:
@@ -23,12 +68,7 @@ def main():
     print("\n=== Step 2: Generating Weekly Report ===")
     cmd_report = [sys.executable, "weekly_report.py"]
     if args.publish_linear:
-        # Check if API KEY is set
-        if "LINEAR_API_KEY" not in os.environ:
-            print("Warning: LINEAR_API_KEY not found in environment variables.")
-            print("Please set it before running with --publish-linear.")
-            # We don't exit here, we let weekly_report.py handle it or fail gracefully
-        
+        check_linear_key()
         cmd_report.append("--publish-linear")
         
     ret = subprocess.call(cmd_report)
@@ -36,7 +76,5 @@ def main():
         print("Error in weekly_report.py")
         sys.exit(ret)
 
-    print("\n=== Pipeline Completed Successfully ===")
-
 if __name__ == "__main__":
     main()
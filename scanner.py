@@ -1,8 +1,13 @@
 import os
 import time
-import datetime
 import argparse
 
+import orjson
+
+from daily_summary import LOG_FILE, _iter_md, _decode
+
+SNIPPET_CHARS = 500
+
 def scan_vault(vault_path, days=7):
     """
     Scans the Obsidian vault for markdown files modified in the last N days.
@@ -15,66 +20,69 @@ def scan_vault(vault_path, days=7):
     
     modified_files = []
     
-    for root, dirs, files in os.walk(vault_path):
-        # Ignore .git or .obsidian folders
-        if '.git' in dirs:
-            dirs.remove('.git')
-        if '.obsidian' in dirs:
-            dirs.remove('.obsidian')
-            
-        for file in files:
-            if not file.endswith('.md'):
-                continue
-                
-            file_path = os.path.join(root, file)
-            try:
-                stat = os.stat(file_path)
-                mtime = stat.st_mtime
-                ctime = stat.st_ctime
-                
-                if mtime > cutoff_time:
-                    modified_files.append({
-                        'path': file_path,
-                        'rel_path': os.path.relpath(file_path, vault_path),
-                        'mtime': mtime,
-                        'ctime': ctime
-                    })
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+    for entry, mtime in _iter_md(vault_path):
+        if mtime > cutoff_time:
+            modified_files.append({
+                'path': entry.path,
+                'rel_path': os.path.relpath(entry.path, vault_path),
+                'mtime': mtime,
+                # Same cached stat as mtime, no extra syscall
+                'ctime': entry.stat().st_ctime
+            })
 
     # Sort by modification time, newest first
     modified_files.sort(key=lambda x: x['mtime'], reverse=True)
     
     return modified_files
 
+def load_log_summaries():
+    """
+    Loads the summaries already written by daily_summary.py.
+    Returns {absolute file path: (timestamp, summary)}, keeping the latest entry per file.
+    """
+    summaries = {}
+    if not os.path.exists(LOG_FILE):
+        return summaries
+    
+    with open(LOG_FILE, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            log = orjson.loads(line)
+            summaries[os.path.abspath(log['file_path'])] = (log['timestamp'], log['summary'])
+    return summaries
+
 def generate_report_context(files):
     """
     Generates a context string for the AI prompt.
+    Uses the daily summary from the log when it is newer than the file, otherwise reads a content snippet.
     """
+    summaries = load_log_summaries()
+    
     context = []
     for f in files:
-        mtime_str = datetime.datetime.fromtimestamp(f['mtime']).strftime('%Y-%m-%d %H:%M:%S')
+        mtime_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(f['mtime']))
         action = "Created" if abs(f['mtime'] - f['ctime']) < 60 else "Modified"
+        context.append(f"### [{action}] {f['rel_path']} ({mtime_str})")
         
-        # Read content snippet (first 500 chars)
-        content = ""
-        for encoding in ['utf-8', 'utf-16', 'gbk', 'latin-1']:
-            try:
-                with open(f['path'], 'r', encoding=encoding) as file:
-                    content = file.read(500).strip()
-                    # Remove empty lines
-                    content = "\n".join([line for line in content.splitlines() if line.strip()])
-                break
-            except UnicodeError:
-                continue
-            except Exception as e:
-                content = f"[Error reading content: {e}]"
-                break
+        logged = summaries.get(os.path.abspath(f['path']))
+        if logged and logged[0] >= f['mtime']:
+            context.append(f"Summary:\n{logged[1]}\n")
+            continue
+        
+        # Read content snippet (first 500 chars); 4 bytes per char covers any UTF-8 text
+        try:
+            with open(f['path'], 'rb') as file:
+                data = file.read(SNIPPET_CHARS * 4)
+            content = _decode(data, final=False)[:SNIPPET_CHARS].strip()
+            # Remove empty lines
+            content = "\n".join([line for line in content.splitlines() if line.strip()])
+        except Exception as e:
+            content = f"[Error reading content: {e}]"
         
         if not content:
              content = "[Error: Unable to decode file content]"
             
-        context.append(f"### [{action}] {f['rel_path']} ({mtime_str})")
         context.append(f"Content Snippet:\n{content}\n")
         
     return "\n".join(context)
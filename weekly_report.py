@@ -1,36 +1,30 @@
-import json
 import datetime
+import time
 import os
 import argparse
+import hashlib
 
 import re
-from collections import Counter
+from collections import Counter, defaultdict
 import httpx
+import orjson
 from dotenv import load_dotenv
 
+from daily_summary import LOG_FILE, load_state, save_state
+
 # Load environment variables from .env file
 load_dotenv()
 
-LOG_FILE = "weekly_log.jsonl"
+# Filename tokenization for topic extraction
+_SPLIT_RE = re.compile(r'[\s\-_,.，。：]+')
+_IGNORE = frozenset({'md', 'the', 'in', 'of', 'a', 'to', 'for', 'on', 'and', 'with', 'by', 'is', 'at', 'txt', 'file', 'new', 'update', 'untitled', '0', '1', '2', '3', 'review', 'planning', 'dev'})
 
-def publish_to_linear(title, content):
+def fetch_linear_team_id(client, url):
     """
-    Publish the report to Linear as an Issue.
-    Requires LINEAR_API_KEY environment variable.
+    Look up the first Linear team (Assuming user wants to post to the first available team).
+    In a real app, this should be configurable.
+    Returns the team id, or None if it could not be fetched.
     """
-    api_key = os.getenv("LINEAR_API_KEY")
-    if not api_key:
-        print("Error: LINEAR_API_KEY environment variable not set. Skipping Linear publication.")
-        return
-
-    url = "https://api.linear.app/graphql"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": api_key
-    }
-
-    # 1. Get the first Team ID (Assuming user wants to post to the first available team)
-    # In a real app, this should be configurable.
     team_query = """
     query {
       teams(first: 1) {
@@ -43,71 +37,109 @@ def publish_to_linear(title, content):
     """
     
     try:
-        response = httpx.post(url, headers=headers, json={"query": team_query})
+        response = client.post(url, json={"query": team_query})
         response.raise_for_status()
         data = response.json()
         
         teams = data.get("data", {}).get("teams", {}).get("nodes", [])
         if not teams:
             print("Error: No Linear teams found. Cannot create issue.")
-            return
+            return None
             
         team_id = teams[0]['id']
         team_name = teams[0]['name']
         print(f"Found Linear Team: {team_name} ({team_id})")
+        return team_id
         
     except Exception as e:
         print(f"Error fetching Linear teams: {e}")
+        return None
+
+def publish_to_linear(title, content):
+    """
+    Publish the report to Linear as an Issue.
+    Requires LINEAR_API_KEY environment variable.
+    """
+    api_key = os.getenv("LINEAR_API_KEY")
+    if not api_key:
+        print("Error: LINEAR_API_KEY environment variable not set. Skipping Linear publication.")
         return
 
-    # 2. Create Issue
-    mutation = """
-    mutation IssueCreate($input: IssueCreateInput!) {
-      issueCreate(input: $input) {
-        success
-        issue {
-          id
-          title
-          url
-        }
-      }
+    url = "https://api.linear.app/graphql"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": api_key
     }
-    """
+
+    # One client for both requests so the TLS connection is reused
+    with httpx.Client(headers=headers, timeout=10.0) as client:
+        # 1. Get the Team ID (cached in state.json after the first lookup, per API key)
+        state = load_state()
+        key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+        cached_team = state.get("linear_team") or {}
+        team_id = cached_team.get("id") if cached_team.get("key_hash") == key_hash else None
+        if team_id:
+            print(f"Using cached Linear Team ({team_id})")
+        else:
+            team_id = fetch_linear_team_id(client, url)
+            if not team_id:
+                return
+            state["linear_team"] = {"id": team_id, "key_hash": key_hash}
+            save_state(state)
+
+        # 2. Create Issue
+        mutation = """
+        mutation IssueCreate($input: IssueCreateInput!) {
+          issueCreate(input: $input) {
+            success
+            issue {
+              id
+              title
+              url
+            }
+          }
+        }
+        """
     
-    variables = {
-        "input": {
-            "title": title,
-            "description": content,
-            "teamId": team_id
+        variables = {
+            "input": {
+                "title": title,
+                "description": content,
+                "teamId": team_id
+            }
         }
-    }
     
-    try:
-        response = httpx.post(url, headers=headers, json={"query": mutation, "variables": variables})
-        response.raise_for_status()
-        result = response.json()
+        published = False
+        try:
+            response = client.post(url, json={"query": mutation, "variables": variables})
+            response.raise_for_status()
+            result = response.json()
         
-        if result.get("data", {}).get("issueCreate", {}).get("success"):
-            issue = result["data"]["issueCreate"]["issue"]
-            print(f"Successfully published to Linear! Issue URL: {issue['url']}")
-        else:
-            print(f"Failed to create Linear issue: {result}")
+            if ((result.get("data") or {}).get("issueCreate") or {}).get("success"):
+                issue = result["data"]["issueCreate"]["issue"]
+                print(f"Successfully published to Linear! Issue URL: {issue['url']}")
+                published = True
+            else:
+                print(f"Failed to create Linear issue: {result}")
             
-    except Exception as e:
-        print(f"Error creating Linear issue: {e}")
+        except Exception as e:
+            print(f"Error creating Linear issue: {e}")
+        
+        if not published:
+            # The cached team may no longer be valid, look it up again next time
+            state.pop("linear_team", None)
+            save_state(state)
 
 
-def extract_topics_and_cluster(logs):
+def extract_topics_and_cluster(all_filenames):
     """
     Extract topics from filenames and group files by these topics.
     Returns a list of (Topic, Count, Files) tuples.
     """
-    all_filenames = [os.path.basename(log['rel_path']) for log in logs]
-    
     # 1. Tokenize and count
-    words = []
-    ignore_words = {'md', 'the', 'in', 'of', 'a', 'to', 'for', 'on', 'and', 'with', 'by', 'is', 'at', 'md', 'txt', 'file', 'new', 'update', 'untitled', '0', '1', '2', '3', 'review', 'planning', 'dev'}
+    counter = Counter()
     
+    # filename -> set of its tokens
     file_tokens = {}
     
     for name in all_filenames:
@@ -115,34 +147,30 @@ def extract_topics_and_cluster(logs):
         # Improvement: Match specific known high-value keywords (English or Chinese)
         # Or just split by standard delimiters
         clean_name = os.path.splitext(name)[0]
-        tokens = re.split(r'[\s\-_,\.，。：]+', clean_name)
         
-        valid_tokens = []
-        for token in tokens:
-            token_clean = token.strip()
-            if len(token_clean) > 1 and token_clean.lower() not in ignore_words:
-                valid_tokens.append(token_clean)
-                words.append(token_clean)
-        
-        file_tokens[name] = valid_tokens
+        valid_tokens = [token for token in _SPLIT_RE.split(clean_name) if len(token) > 1 and token.lower() not in _IGNORE]
+        counter.update(valid_tokens)
+        file_tokens[name] = set(valid_tokens)
 
-    if not words:
+    if not counter:
         return []
 
     # 2. Find top keywords
-    counter = Counter(words)
     most_common = counter.most_common(5) # Top 5 keywords
     
     clusters = []
     processed_files = set()
     
+    # Inverted index: token -> files containing it, in first-seen order
+    files_by_token = defaultdict(list)
+    for name, tokens in file_tokens.items():
+        for token in tokens:
+            files_by_token[token].append(name)
+    
     for keyword, count in most_common:
         # Find files containing this keyword
-        related_files = []
-        for name, tokens in file_tokens.items():
-            if keyword in tokens and name not in processed_files:
-                related_files.append(name)
-                processed_files.add(name)
+        related_files = [name for name in files_by_token[keyword] if name not in processed_files]
+        processed_files.update(related_files)
         
         if related_files:
             clusters.append((keyword, len(related_files), related_files))
@@ -156,20 +184,37 @@ def generate_report(output_path, publish_linear=False):
         print("No logs found. Run daily_summary.py first.")
         return
 
-    logs = []
-    with open(LOG_FILE, 'r', encoding='utf-8') as f:
+    # Single pass over the log: collect filenames, folder groups and timestamps without keeping the entries
+    all_filenames = []
+    grouped_logs = {}
+    log_dates = []
+    with open(LOG_FILE, 'rb') as f:
         for line in f:
-            if line.strip():
-                logs.append(json.loads(line))
+            if not line.strip():
+                continue
+            log = orjson.loads(line)
+            
+            # Split rel_path once for both the filename and the top-level folder
+            rel_path = log['rel_path']
+            filename = rel_path.rsplit(os.sep, 1)[-1]
+            all_filenames.append(filename)
+            
+            # Group by top-level folder for the "Outputs" section
+            folder = rel_path.split(os.sep, 1)[0] if os.sep in rel_path else "Uncategorized"
+            if folder not in grouped_logs:
+                grouped_logs[folder] = set()
+            grouped_logs[folder].add(filename)
+            
+            log_dates.append(log['timestamp'])
     
-    if not logs:
+    if not all_filenames:
         print("Log file is empty.")
         return
 
-    print(f"Found {len(logs)} activities. Generating report context...")
+    print(f"Found {len(all_filenames)} activities. Generating report context...")
     
     # Analyze Topics
-    clusters = extract_topics_and_cluster(logs)
+    clusters = extract_topics_and_cluster(all_filenames)
     
     # Generate "Work Focus" section
     focus_summary = []
@@ -190,46 +235,25 @@ def generate_report(output_path, publish_linear=False):
         focus_summary.append("**General**: 零散更新，未发现明显聚集的主题。")
 
     # Generate "Outputs" section (Grouped by folder for reference)
-    grouped_logs = {}
-    for log in logs:
-        folder = os.path.dirname(log['rel_path']).split(os.sep)[0]
-        if not folder or folder == ".":
-            folder = "Uncategorized"
-        if folder not in grouped_logs:
-            grouped_logs[folder] = []
-        grouped_logs[folder].append(log)
-
-    outputs_section = ""
-    for folder, folder_logs in grouped_logs.items():
-        outputs_section += f"\n### {folder}\n"
-        filenames = sorted(list(set([os.path.basename(log['rel_path']) for log in folder_logs])))
-        for filename in filenames:
-            outputs_section += f"- {filename}\n"
+    outputs_parts = []
+    for folder, folder_files in grouped_logs.items():
+        outputs_parts.append(f"\n### {folder}\n")
+        outputs_parts.extend(f"- {filename}\n" for filename in sorted(folder_files))
+    outputs_section = "".join(outputs_parts)
             
-    current_date = datetime.datetime.now().strftime('%Y-%m-%d')
-    week_num = datetime.datetime.now().strftime('%Y-W%W')
+    now = datetime.datetime.now()
+    current_date = now.strftime('%Y-%m-%d')
+    week_num = now.strftime('%Y-W%W')
 
     # Calculate date range from logs for the title
-    log_dates = []
-    for log in logs:
-        try:
-            # Parse date_str "YYYY-MM-DD HH:MM:SS"
-            dt = datetime.datetime.strptime(log['date_str'], '%Y-%m-%d %H:%M:%S')
-            log_dates.append(dt)
-        except ValueError:
-            continue
-    
-    if log_dates:
-        start_date_str = min(log_dates).strftime('%m%d')
-        end_date_str = max(log_dates).strftime('%m%d')
-        report_title_text = f"Obsidian Weekly Review: {start_date_str}-{end_date_str}"
-    else:
-        report_title_text = f"Obsidian Weekly Review: {week_num}"
+    start_date_str = time.strftime('%m%d', time.localtime(min(log_dates)))
+    end_date_str = time.strftime('%m%d', time.localtime(max(log_dates)))
+    report_title_text = f"Obsidian Weekly Review: {start_date_str}-{end_date_str}"
 
     report_content = f"""*Generated by AIC Agent on {current_date}*
 
 ## 本周工作重心
-本周共产生/修改了 **{len(logs)}** 个文件。通过 AI 分析，主要知识增量集中在以下领域：
+本周共产生/修改了 **{len(all_filenames)}** 个文件。通过 AI 分析，主要知识增量集中在以下领域：
 
 {os.linesep.join(['- ' + s for s in focus_summary])}
 
@@ -245,7 +269,7 @@ def generate_report(output_path, publish_linear=False):
 """
 
     # Write Report
-    output_file = os.path.join(output_path, f"Weekly_Report_{datetime.datetime.now().strftime('%Y-W%W')}.md")
+    output_file = os.path.join(output_path, f"Weekly_Report_{week_num}.md")
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(report_content)
         